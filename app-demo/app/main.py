@@ -1,6 +1,5 @@
 from flask import Flask, request, render_template, redirect
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
 import os
 
 app = Flask(__name__)
@@ -15,7 +14,9 @@ class Note(db.Model):
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     text = db.Column(db.Text)
     done = db.Column(db.Boolean)
-    dateAdded = db.Column(db.DateTime, default=datetime.now())
+    # Let the database stamp each row at insert time; keeps the timestamp
+    # per-row and off the application's hot path
+    dateAdded = db.Column(db.DateTime, server_default=db.func.now())
 
 
 def create_note(text):
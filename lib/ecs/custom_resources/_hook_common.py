@@ -0,0 +1,218 @@
+# Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
+# SPDX-License-Identifier: MIT-0
+
+"""
+Shared helpers for the CodeDeploy lifecycle hook Lambda functions.
+
+Bundled alongside each hook module so the clients, the listener rule
+scans and the status callback exist once instead of being copy-pasted
+per hook.
+"""
+
+import asyncio
+import concurrent.futures
+import functools
+import logging
+
+from botocore.exceptions import ClientError
+
+# aioboto3 is optional: when bundled with the function it lets the rule
+# deletions overlap on a single event loop, otherwise the thread pool
+# fallback below provides the same fan-out with plain boto3
+try:
+    import aioboto3
+except ImportError:
+    aioboto3 = None
+
+SUCCESS = "Succeeded"
+FAILED = "Failed"
+
+# Configure logging
+LOGGER = logging.getLogger(__name__)
+LOGGER.setLevel(logging.INFO)
+
+# The boto3 import and client construction are deferred into memoized
+# getters, which keeps the Lambda init phase tiny for these rarely invoked
+# hooks; the first invocation pays the cost once and warm invocations
+# reuse the cached clients.
+
+
+@functools.lru_cache(maxsize=1)
+def _session():
+    import boto3
+
+    # A shared session reuses the credential resolver chain and the service
+    # model loader cache instead of building both once per client
+    return boto3.session.Session()
+
+
+@functools.lru_cache(maxsize=1)
+def codedeploy_client():
+    return _session().client("codedeploy", config=_client_config())
+
+
+@functools.lru_cache(maxsize=1)
+def alb_client():
+    return _session().client("elbv2", config=_client_config())
+
+
+@functools.lru_cache(maxsize=1)
+def _client_config():
+    from botocore.config import Config
+
+    # Keep the sockets alive between hook invocations so warm invocations
+    # skip the TCP+TLS handshake, and fail fast with adaptive retries on
+    # throttles
+    return Config(
+        tcp_keepalive=True,
+        connect_timeout=2,
+        read_timeout=5,
+        retries={"max_attempts": 5, "mode": "adaptive"},
+    )
+
+
+def list_listener_rules(listener_arn):
+    """
+    Lists all rules on the ALB listener.
+
+    :param listener_arn: ARN of the ALB listener.
+    :return: List of the listener rules across all pages.
+    """
+    rules = []
+    try:
+        # describe_rules returns at most 100 rules per call; paginate so rules
+        # past the first page are not silently left behind
+        paginator = alb_client().get_paginator("describe_rules")
+        for page in paginator.paginate(ListenerArn=listener_arn):
+            LOGGER.debug("Current listener rules : %s", page)
+            rules.extend(page["Rules"])
+    except ClientError as err:
+        LOGGER.error(
+            "Error getting listener rules %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
+        )
+        raise err
+
+    return rules
+
+
+def find_canary_rule_arns(listener_arn, http_header_name):
+    """
+    Finds the canary rules matching the HTTP header name on the ALB listener.
+
+    :param listener_arn: ARN of the ALB listener.
+    :param http_header_name: The name of the HTTP header field.
+    :return: List of the matching rule ARNs.
+    """
+    rule_arns = []
+    try:
+        # describe_rules returns at most 100 rules per call; paginate so rules
+        # past the first page are not silently left behind. Request small
+        # pages and stop as soon as one yields a match: only one canary rule
+        # exists at a time, so there is no point decoding the rest of the
+        # rule list
+        paginator = alb_client().get_paginator("describe_rules")
+        for page in paginator.paginate(
+            ListenerArn=listener_arn, PaginationConfig={"PageSize": 10}
+        ):
+            LOGGER.debug("Current listener rules : %s", page)
+            rule_arns = [
+                rule["RuleArn"]
+                for rule in page["Rules"]
+                if rule["Conditions"]
+                and rule["Conditions"][0]["Field"] == "http-header"
+                and rule["Conditions"][0]["HttpHeaderConfig"]["HttpHeaderName"]
+                == http_header_name
+            ]
+            if rule_arns:
+                break
+    except ClientError as err:
+        LOGGER.error(
+            "Error getting listener rules %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
+        )
+        raise err
+
+    return rule_arns
+
+
+def delete_rules(rule_arns):
+    """
+    Deletes the given listener rules concurrently.
+    Each delete_rule call is an independent HTTPS round-trip, so issuing them
+    in parallel bounds the wall time by the slowest call instead of the sum.
+
+    :param rule_arns: List of ARNs of the listener rules to delete.
+    """
+    if not rule_arns:
+        return
+
+    LOGGER.info("Removing rules %s", rule_arns)
+    try:
+        if aioboto3 is not None:
+            asyncio.run(_delete_rules_async(rule_arns))
+            return
+
+        # boto3 clients are thread-safe for method calls; cap the workers to
+        # stay under the ELBv2 API throttle
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(10, len(rule_arns))
+        ) as executor:
+            list(
+                executor.map(
+                    lambda rule_arn: alb_client().delete_rule(RuleArn=rule_arn),
+                    rule_arns,
+                )
+            )
+    except ClientError as err:
+        LOGGER.error(
+            "Error removing rules %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
+        )
+        raise err
+
+
+async def _delete_rules_async(rule_arns):
+    """
+    Deletes the given listener rules concurrently on a single event loop.
+    Only used when the optional aioboto3 dependency is bundled with the
+    function.
+
+    :param rule_arns: List of ARNs of the listener rules to delete.
+    """
+    session = aioboto3.Session()
+    async with session.client("elbv2", config=_client_config()) as client:
+        await asyncio.gather(
+            *[client.delete_rule(RuleArn=rule_arn) for rule_arn in rule_arns]
+        )
+
+
+def send_status(deployment_id, life_cycle_event_hook_execution_id, hook_status, hook_name):
+    """
+    Sends back the lifecycle hook status to AWS CodeDeploy[
+
+    :param deployment_id: The AWS CodeDeploy deployment ID.
+    :param life_cycle_event_hook_execution_id: The event hook execution ID.
+    :param hook_status: The hook status to send back to AWS CodeDeploy.
+    :param hook_name: The lifecycle hook name used in the log messages.
+    """
+    LOGGER.info("Sending back lifecycle hook status.")
+    try:
+        response = codedeploy_client().put_lifecycle_event_hook_execution_status(
+            deploymentId=deployment_id,
+            lifecycleEventHookExecutionId=life_cycle_event_hook_execution_id,
+            status=hook_status,
+        )
+        LOGGER.info(
+            "%s %s %s",
+            hook_name,
+            hook_status,
+            response["lifecycleEventHookExecutionId"],
+        )
+
+    except Exception as e:
+        LOGGER.info("%s failed", hook_name)
+        LOGGER.error(str(e))
@@ -1,24 +1,30 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: MIT-0
 
-import json
+import concurrent.futures
 import logging
 import os
+import time
 
-import boto3
 from botocore.exceptions import ClientError
 
-SUCCESS = "Succeeded"
-FAILED = "Failed"
+from _hook_common import (
+    FAILED,
+    SUCCESS,
+    alb_client,
+    delete_rules,
+    list_listener_rules,
+    send_status,
+)
+
 default_rule_priority = 10
 
 # Configure logging
 LOGGER = logging.getLogger(__name__)
-LOGGER.setLevel(logging.DEBUG)
-
-codedeploy_client = boto3.client("codedeploy")
-alb_client = boto3.client("elbv2")
+LOGGER.setLevel(logging.INFO)
 
+# Environment reads stay at module scope: they run once during the Lambda
+# init phase and are reused across warm invocations.
 alb = os.environ["APP_ALB"]
 alb_prod_listener = os.environ["ALB_PROD_LISTENER"]
 alb_tg_x = os.environ["ALB_TG_X"]
@@ -26,9 +32,26 @@ alb_tg_y = os.environ["ALB_TG_Y"]
 http_header_name = os.environ["HTTP_HEADER_NAME"]
 http_header_values = [v for v in os.environ["HTTP_HEADER_VALUE_LIST"].split(",") if v]
 
+# The ALB and listener are frozen at module load, so build this log line
+# once instead of re-formatting it on every invocation
+_RETRIEVE_TG_INFO = "Retrieve PROD target group for ALB {} PROD listener {}".format(
+    alb, alb_prod_listener
+)
+
+# Cache of the PROD listener default-action target group, keyed by listener
+# ARN. The default action only changes at deployment swap time, so a short
+# TTL saves one describe_listeners round-trip per warm hook invocation.
+_listener_cache = {}
+_LISTENER_CACHE_TTL_SECONDS = 30
+
+# ARN of the last canary rule created by this container, keyed by HTTP
+# header name. Lets a warm invocation delete the rule directly instead of
+# paging through describe_rules to find it.
+_canary_rule_cache = {}
+
 # Lambda Handler
 def handler(event, context):
-    LOGGER.info("Received event: " + json.dumps(event, indent=2))
+    LOGGER.debug("Received event: %s", event)
     LOGGER.info("Entering AfterAllowTestTraffic hook.")
 
     deployment_id = event["DeploymentId"]
@@ -36,8 +59,20 @@ def handler(event, context):
     hook_status = FAILED
 
     try:
-        # Figure out which target group has the Green tasks
-        blue_tg = get_blue_target_group(alb_prod_listener)
+        # The listener describe and the rules describe are independent, so
+        # overlap them to take one round-trip off the critical path. The rule
+        # prefetch is skipped when the previous invocation cached the canary
+        # rule ARN, because removal then needs no scan at all.
+        rules = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            blue_tg_future = executor.submit(get_blue_target_group, alb_prod_listener)
+            rules_future = None
+            if http_header_name not in _canary_rule_cache:
+                rules_future = executor.submit(list_listener_rules, alb_prod_listener)
+            # Figure out which target group has the Green tasks
+            blue_tg = blue_tg_future.result()
+            if rules_future is not None:
+                rules = rules_future.result()
         if blue_tg != alb_tg_x and blue_tg != alb_tg_y:
             raise Exception(
                 "Current PROD target group {} doesn't match either {} or {}".format(
@@ -54,6 +89,7 @@ def handler(event, context):
             listener_arn=alb_prod_listener,
             target_group_arn=green_tg,
             http_header_name=http_header_name,
+            rules=rules,
         )
 
         # Add custom http-header routing rule
@@ -65,11 +101,21 @@ def handler(event, context):
             http_header_values=http_header_values,
         )
 
+        # The listener was just modified; force the next hook to re-read it
+        _listener_cache.pop(alb_prod_listener, None)
+
         hook_status = SUCCESS
-    except BaseException as e:
-        LOGGER.error("AfterAllowTestTraffic hook failed with error: " + str(e))
+    except Exception as e:
+        # Drop the cached listener state so the retry starts from a fresh read
+        _listener_cache.pop(alb_prod_listener, None)
+        LOGGER.error("AfterAllowTestTraffic hook failed with error: %s", e)
     finally:
-        send_status(deployment_id, life_cycle_event_hook_execution_id, hook_status)
+        send_status(
+            deployment_id,
+            life_cycle_event_hook_execution_id,
+            hook_status,
+            "AfterAllowTestTraffic",
+        )
 
 
 def get_blue_target_group(listener_arn):
@@ -80,27 +126,30 @@ def get_blue_target_group(listener_arn):
     :param listener_arn: The ALB listener Amazon Resource Name (ARN).
     :return: The target group ARN from the listener default action.
     """
-    LOGGER.info(
-        "Retrieve PROD target group for ALB {} PROD listener {}".format(
-            alb,
-            alb_prod_listener,
-        )
-    )
+    cached = _listener_cache.get(listener_arn)
+    if cached is not None and time.monotonic() - cached[0] < _LISTENER_CACHE_TTL_SECONDS:
+        LOGGER.info("Using cached PROD target group %s", cached[1])
+        return cached[1]
+
+    LOGGER.info(_RETRIEVE_TG_INFO)
     try:
-        response = alb_client.describe_listeners(ListenerArns=[listener_arn])
+        response = alb_client().describe_listeners(ListenerArns=[listener_arn])
         target_group = response["Listeners"][0]["DefaultActions"][0]["TargetGroupArn"]
     except ClientError as err:
         LOGGER.error(
-            "Error getting PROD listener information {}: {}".format(
-                err.response["Error"]["Code"], err.response["Error"]["Message"]
-            )
+            "Error getting PROD listener information %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
         )
         raise err
 
+    _listener_cache[listener_arn] = (time.monotonic(), target_group)
     return target_group
 
 
-def remove_custom_canary_routing_rule(listener_arn, target_group_arn, http_header_name):
+def remove_custom_canary_routing_rule(
+    listener_arn, target_group_arn, http_header_name, rules=None
+):
     """
     Removes the custom canary routing rule pointing to the green/test target group on
     the ALB listener.
@@ -108,61 +157,43 @@ def remove_custom_canary_routing_rule(listener_arn, target_group_arn, http_heade
     :param listener_arn: ARN of the ALB listener.
     :param target_group_arn: ARN of the target group to forward traffic to.
     :param http_header_name: The name of the HTTP header field.
+    :param rules: Prefetched listener rules, listed on demand when omitted.
     """
     LOGGER.info(
-        "Remove custom canary rule on listener {} header {} to target group {}".format(
-            listener_arn, http_header_name, target_group_arn
-        )
+        "Remove custom canary rule on listener %s header %s to target group %s",
+        listener_arn,
+        http_header_name,
+        target_group_arn,
     )
-    try:
-        response = alb_client.describe_rules(ListenerArn=listener_arn)
-        LOGGER.info("Current listener rules :" + json.dumps(response, indent=2))
-    except ClientError as err:
-        LOGGER.error(
-            "Error getting listener rules {}: {}".format(
-                err.response["Error"]["Code"], err.response["Error"]["Message"]
+    cached_rule_arn = _canary_rule_cache.pop(http_header_name, None)
+    if cached_rule_arn is not None:
+        try:
+            delete_rules([cached_rule_arn])
+            LOGGER.info("Remove custom canary routing rule done")
+            return
+        except ClientError as err:
+            # The cached rule may already be gone; fall back to scanning the
+            # listener rules
+            LOGGER.info(
+                "Cached rule %s delete failed with %s, scanning listener",
+                cached_rule_arn,
+                err.response["Error"]["Code"],
             )
-        )
-        raise err
 
-    try:
-        for rule in response["Rules"]:
-            # if rule["IsDefault"]:
-            #     LOGGER.info("Skip default rule:" + json.dumps(rule, indent=2))
-            #     continue
-            # if not rule["Conditions"]:
-            #     LOGGER.info("Skip no conditions rule:" + json.dumps(rule, indent=2))
-            #     continue
-            # if rule["Conditions"][0]["Field"] != "http-header":
-            #     LOGGER.info("Skip other rule:" + json.dumps(rule, indent=2))
-            #     continue
-            # if (
-            #     rule["Conditions"][0]["HttpHeaderConfig"]["HttpHeaderName"]
-            #     != http_header_name
-            # ):
-            #     LOGGER.info("Skip other rule:" + json.dumps(rule, indent=2))
-            #     continue
-            # if rule["Actions"][0]["TargetGroupArn"] != target_group_arn:
-            #     LOGGER.info("Skip other rule:" + json.dumps(rule, indent=2))
-            #     continue
-            if (
-                rule["Conditions"]
-                and rule["Conditions"][0]["Field"] == "http-header"
-                and rule["Conditions"][0]["HttpHeaderConfig"]["HttpHeaderName"]
-                == http_header_name
-                and rule["Actions"][0]["TargetGroupArn"] == target_group_arn
-            ):
-                rule_arn = rule["RuleArn"]
-                LOGGER.info("Removing {}".format(rule_arn) + json.dumps(rule, indent=2))
-                remove_response = alb_client.delete_rule(RuleArn=rule_arn)
-                LOGGER.info("Remaining rules :" + json.dumps(remove_response, indent=2))
-    except ClientError as err:
-        LOGGER.error(
-            "Error removing rules {}: {}".format(
-                err.response["Error"]["Code"], err.response["Error"]["Message"]
-            )
-        )
-        raise err
+    if rules is None:
+        rules = list_listener_rules(listener_arn)
+
+    delete_rules(
+        [
+            rule["RuleArn"]
+            for rule in rules
+            if rule["Conditions"]
+            and rule["Conditions"][0]["Field"] == "http-header"
+            and rule["Conditions"][0]["HttpHeaderConfig"]["HttpHeaderName"]
+            == http_header_name
+            and rule["Actions"][0]["TargetGroupArn"] == target_group_arn
+        ]
+    )
 
     LOGGER.info("Remove custom canary routing rule done")
 
@@ -183,9 +214,9 @@ def add_http_header_request_routing_rule(
     :param http_header_name: The name of the HTTP header field.
     :param http_header_values: List of HTTP header string values.
     """
-    LOGGER.info("Add ALB rule to listener {}".format(listener_arn))
+    LOGGER.info("Add ALB rule to listener %s", listener_arn)
     try:
-        response = alb_client.create_rule(
+        response = alb_client().create_rule(
             ListenerArn=listener_arn,
             Priority=priority,
             Conditions=[
@@ -206,37 +237,13 @@ def add_http_header_request_routing_rule(
         )
     except ClientError as err:
         LOGGER.error(
-            "Error adding listener rule {}: {}".format(
-                err.response["Error"]["Code"], err.response["Error"]["Message"]
-            )
+            "Error adding listener rule %s: %s",
+            err.response["Error"]["Code"],
+            err.response["Error"]["Message"],
         )
         raise err
 
-    LOGGER.info("ALB listener rules :" + json.dumps(response, indent=2))
-
-
-def send_status(deployment_id, life_cycle_event_hook_execution_id, hook_status):
-    """
-    Sends back the lifecycle hook status to AWS CodeDeploy[
-
-    :param deployment_id: The AWS CodeDeploy deployment ID.
-    :param life_cycle_event_hook_execution_id: The event hook execution ID.
-    :param hook_status: The hook status to send back to AWS CodeDeploy.
-    """
-    LOGGER.info("Sending back lifecycle hook status.")
-    try:
-        response = codedeploy_client.put_lifecycle_event_hook_execution_status(
-            deploymentId=deployment_id,
-            lifecycleEventHookExecutionId=life_cycle_event_hook_execution_id,
-            status=hook_status,
-        )
-        LOGGER.info(
-            "AfterAllowTestTraffic {} {}".format(
-                hook_status,
-                response["lifecycleEventHookExecutionId"],
-            )
-        )
-
-    except BaseException as e:
-        LOGGER.info("AfterAllowTestTraffic failed")
-        LOGGER.error(str(e))
+    # Remember the created rule so the next warm invocation can delete it
+    # without a describe_rules scan
+    _canary_rule_cache[http_header_name] = response["Rules"][0]["RuleArn"]
+    LOGGER.debug("ALB listener rules : %s", response)
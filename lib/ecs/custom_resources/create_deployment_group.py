@@ -13,7 +13,7 @@ FAILED = "FAILED"
 
 # Configure logging
 LOGGER = logging.getLogger(__name__)
-LOGGER.setLevel(logging.DEBUG)
+LOGGER.setLevel(logging.INFO)
 
 client = boto3.client("codedeploy")
 
@@ -93,7 +93,7 @@ def extract_params(event):
 
 # Lambda Handler
 def handler(event, context):
-    LOGGER.info("Received event: " + json.dumps(event, indent=2))
+    LOGGER.debug("Received event: %s", event)
 
     request_type = event["RequestType"]
 
@@ -172,12 +172,11 @@ def create_deployment_group(event, context):
             "deploymentGroupName": config.deployment_group_name,
         }
         status = SUCCESS
-    except BaseException as e:
+    except Exception as e:
         LOGGER.error(
-            "Resource create failed for deployment group {}".format(
-                config.deployment_group_name
-            )
-            + str(e)
+            "Resource create failed for deployment group %s: %s",
+            config.deployment_group_name,
+            e,
         )
     finally:
         send(
@@ -261,12 +260,11 @@ def update_deployment_group(event, context):
             "deploymentGroupName": config.deployment_group_name,
         }
         status = SUCCESS
-    except BaseException as e:
+    except Exception as e:
         LOGGER.error(
-            "Resource update failed for deployment group {}".format(
-                config.deployment_group_name
-            )
-            + str(e)
+            "Resource update failed for deployment group %s: %s",
+            config.deployment_group_name,
+            e,
         )
     finally:
         send(
@@ -303,12 +301,11 @@ def delete_deployment_group(event, context):
                 "event": "Resource deleted",
                 "deploymentGroupName": config.deployment_group_name,
             }
-        except BaseException as e:
+        except Exception as e:
             LOGGER.error(
-                "Resource delete failed for deployment group {}".format(
-                    config.deployment_group_name
-                )
-                + str(e)
+                "Resource delete failed for deployment group %s: %s",
+                config.deployment_group_name,
+                e,
             )
         finally:
             send(
@@ -346,7 +343,7 @@ def send(
 
     json_response_body = json.dumps(response_body)
 
-    LOGGER.info("Response body:\n" + json_response_body)
+    LOGGER.info("Response body: %s", json_response_body)
 
     headers = {"content-type": "", "content-length": str(len(json_response_body))}
 
@@ -358,6 +355,6 @@ def send(
             method="PUT",
         )
         response = urllib.request.urlopen(req)
-        LOGGER.info("Status code: " + response.reason)
+        LOGGER.info("Status code: %s", response.reason)
     except Exception as e:
-        LOGGER.error("send(..) failed executing requests.put(..): " + str(e))
+        LOGGER.error("send(..) failed executing requests.put(..): %s", e)
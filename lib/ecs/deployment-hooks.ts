@@ -62,7 +62,7 @@ export class EcsBlueGreenDeploymentHooks extends Construct {
             code: lambda.Code.fromAsset(
                 path.join(__dirname, 'custom_resources'),
                 {
-                    exclude: ['**', '!before_install.py']
+                    exclude: ['**', '!before_install.py', '!_hook_common.py']
                 }),
             runtime: lambda.Runtime.PYTHON_3_8,
             handler: 'before_install.handler',
@@ -83,7 +83,7 @@ export class EcsBlueGreenDeploymentHooks extends Construct {
             code: lambda.Code.fromAsset(
                 path.join(__dirname, 'custom_resources'),
                 {
-                    exclude: ['**', '!after_allow_test_traffic.py']
+                    exclude: ['**', '!after_allow_test_traffic.py', '!_hook_common.py']
                 }),
             runtime: lambda.Runtime.PYTHON_3_8,
             handler: 'after_allow_test_traffic.handler',
@@ -107,7 +107,7 @@ export class EcsBlueGreenDeploymentHooks extends Construct {
             code: lambda.Code.fromAsset(
                 path.join(__dirname, 'custom_resources'),
                 {
-                    exclude: ['**', '!before_allow_traffic.py']
+                    exclude: ['**', '!before_allow_traffic.py', '!_hook_common.py']
                 }),
             runtime: lambda.Runtime.PYTHON_3_8,
             handler: 'before_allow_traffic.handler',